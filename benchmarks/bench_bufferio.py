@@ -0,0 +1,55 @@
+import argparse
+import pathlib
+import tempfile
+import time
+
+from parsing.bufferio import BufferContainer, StringContainer, FileContainer
+
+sample = (pathlib.Path(__file__).parent.parent / 'samples' / 'power_2.bt').read_text()
+
+
+def make_source(size: int) -> str:
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def scan(buffer: BufferContainer) -> int:
+    # Mimics the legacy lexer, every lexeme is read once speculatively, rolled back, then read for real
+    n = 0
+    while not buffer.is_empty():
+        buffer.set_reset_point()
+        for _ in range(8):
+            buffer.read_char()
+        buffer.reset()
+        for _ in range(8):
+            buffer.read_char()
+        n += 8
+    return n
+
+
+def time_container(make) -> float:
+    buffer = make()
+    start = time.perf_counter()
+    scan(buffer)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checks that BufferContainer access scales linearly with source size')
+    parser.add_argument('--max-size', type=int, default=50 * 1024 * 1024)
+    args = parser.parse_args()
+
+    sizes = [s for s in [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 50 << 20] if s <= args.max_size]
+    print('{:>12} {:>16} {:>16}'.format('size', 'string ns/char', 'file ns/char'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            source = make_source(size)
+            path = pathlib.Path(tmp) / 'source.bt'
+            path.write_text(source)
+
+            st = time_container(lambda: StringContainer(source))
+            ft = time_container(lambda: FileContainer(path))
+            print('{:>12} {:>16.1f} {:>16.1f}'.format(size, st * 1e9 / size, ft * 1e9 / size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from parsing.bufferio import MappedFileContainer
+from parsing.lexer import TableLexer
+
+sample = (pathlib.Path(__file__).parent.parent / 'samples' / 'power_2.bt').read_text()
+
+
+def lex(path: pathlib.Path):
+    lexer = TableLexer(MappedFileContainer(path))
+    start = time.perf_counter()
+    n = 0
+    while lexer.get_next() is not None:
+        n += 1
+    elapsed = time.perf_counter() - start
+    print(n, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of lexing memory mapped files of increasing size')
+    parser.add_argument('--max-size', type=int, default=64 * 1024 * 1024)
+    parser.add_argument('--lex', type=pathlib.Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.lex is not None:
+        lex(args.lex)
+        return
+
+    sizes = [s for s in [1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20] if s <= args.max_size]
+    print('{:>12} {:>10} {:>10} {:>14}'.format('size', 'lexemes', 'MB/s', 'peak rss KiB'))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'source.bt'
+        for size in sizes:
+            with open(path, 'w') as fp:
+                for _ in range(size // len(sample)):
+                    fp.write(sample)
+
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_lexer_memory', '--lex', str(path)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            n, elapsed, rss = int(out[0]), float(out[1]), int(out[2])
+            print('{:>12} {:>10} {:>10.2f} {:>14}'.format(size, n, size / elapsed / 1e6, rss))
+
+
+if __name__ == '__main__':
+    main()
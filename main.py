@@ -4,7 +4,7 @@ from pygame import QUIT, KEYDOWN
 
 from parsing.bufferio import StringContainer, FileContainer
 from parsing.commander import Commander
-from parsing.lexer import Lexer
+from parsing.lexer import TokenizedLexer
 from parsing.parser import AST
 from turing.environment import TheTape
 from turing.machine import TuringMachine
@@ -106,7 +106,7 @@ def main():
     def run_simulation():
         tape.reset(True)
 
-        code = AST(Lexer(StringContainer(test) if len(str(fname)) == 0 else FileContainer(fname)))
+        code = AST(TokenizedLexer(StringContainer(test) if len(str(fname)) == 0 else FileContainer(fname)))
         code.build_tree()
 
         commander = Commander(code)
@@ -1,6 +1,9 @@
-from typing import Union, Dict
+from typing import Union, Dict, List, Tuple
 import pathlib
+import codecs
 import json
+import mmap
+import os
 
 
 class BufferContainer:
@@ -8,47 +11,60 @@ class BufferContainer:
         self.line = 1
         self.has_error = False
         self.error: Union[None, BaseException] = None
-        self.prev_reset_point = ''
-        self.reset_point = ''
-        self.reset_additions = []
-        self.buffer = ''
+        self.reset_additions: List[Tuple[int, int]] = []
+        self.text = ''
+        self.pos = 0
+        self.reset_pos = 0
+        self.reset_line = 1
         self.buffer_size = buffer_size
         self.line_start = True
-        self.initial_position = True
 
     def __repr__(self):
-        return 'file: {} line: {} contents: {}'.format(self.error_name[-5:], self.line, self.buffer[-5:])
+        return 'file: {} line: {} contents: {}'.format(self.error_name[-5:], self.line,
+                                                       self.text[self.pos:self.pos + 5][::-1])
 
     @property
     def error_name(self) -> str:
         return ''
 
+    @property
+    def buffer(self) -> str:
+        # The unread characters, last character first
+        return self.text[self.pos:][::-1]
+
+    @property
+    def reset_point(self) -> str:
+        return self.text[self.reset_pos:self.pos]
+
+    @property
+    def prev_reset_point(self) -> str:
+        return self.text[self.reset_pos - 1] if self.reset_pos > 0 else ''
+
     def is_empty(self) -> bool:
-        return len(self.buffer) == 0
+        return self.pos >= len(self.text)
 
     def __len__(self) -> int:
-        return len(self.buffer)
+        return len(self.text) - self.pos
 
     def set_reset_point(self):
-        if len(self.reset_point):
-            if self.initial_position:
-                self.initial_position = False
-
-            self.prev_reset_point = self.reset_point[-1]
-        self.reset_point = ''
+        self.reset_pos = self.pos
+        self.reset_line = self.line
         self.reset_additions = []
 
     def peek(self, n: int = 0) -> str:
-        if (0 <= n < len(self.buffer)) or (n < 0 and abs(n) <= len(self.buffer)):
-            return self.buffer[n]
+        # Indexes the unread characters the same way as self.buffer
+        i = len(self.text) - 1 - n if n >= 0 else self.pos - n - 1
+        if self.pos <= i < len(self.text):
+            return self.text[i]
         return ''
 
     def read_char(self) -> str:
-        if len(self.buffer) == 0:
+        if self.pos >= len(self.text):
             # We hit the end of the file
             return ''
 
-        c = self.buffer[-1]
+        c = self.text[self.pos]
+        self.pos += 1
 
         self.line_start = False
         if c == '\n' or c == '\f':
@@ -57,36 +73,44 @@ class BufferContainer:
         if c == '\n' or c == '\r':
             self.line_start = True
 
-        self.buffer = self.buffer[:-1]
-        if len(self.reset_additions) == 0:
-            self.reset_point += c
-        else:
-            i, s = self.reset_additions[-1]
-            self.reset_additions[-1] = (i, s[:-1])
         return c
 
+    def read_chunk(self, size: int) -> str:
+        # Consumes up to size characters at once, these can not be rolled back with reset
+        chunk = self.text[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        self.line += chunk.count('\n') + chunk.count('\f')
+        if len(chunk) > 0:
+            self.line_start = chunk[-1] == '\n' or chunk[-1] == '\r'
+        self.set_reset_point()
+        return chunk
+
     def push_str(self, s: str, track_addition: bool = True, reset: bool = False):
-        if track_addition:
-            self.reset_additions.append((len(self.buffer), ''.join(reversed(s))))
-        self.buffer += ''.join(reversed(s))
+        start = self.pos - len(s)
+        if not track_addition and start >= self.reset_pos and self.text.startswith(s, start):
+            # Handing back what was just read only moves the cursor
+            self.pos = start
+        else:
+            self.text = self.text[:self.pos] + s + self.text[self.pos:]
+            if track_addition:
+                self.reset_additions.append((self.pos, len(s)))
+
+        if not track_addition:
+            # Characters handed back get counted again when they are re-read
+            self.line -= s.count('\n') + s.count('\f')
+
         if reset:
             self.reset()
 
     def reset(self):
-        self.buffer += ''.join(reversed(self.reset_point))
-
         # Chop out the additions
-        for i, s in self.reset_additions:
-            self.buffer = self.buffer[:i] + self.buffer[i + len(s):]
-
-        self.line_start = self.initial_position if len(self.prev_reset_point) == 0 else \
-            (self.prev_reset_point == '\n' or self.prev_reset_point == '\r')
-
-        for c in self.reset_point:
-            if c == '\n' or c == '\f':
-                self.line -= 1
+        for i, n in reversed(self.reset_additions):
+            self.text = self.text[:i] + self.text[i + n:]
+        self.reset_additions = []
 
-        self.reset_point = ''
+        self.pos = self.reset_pos
+        self.line = self.reset_line
+        self.line_start = self.pos == 0 or self.text[self.pos - 1] in '\n\r'
 
 
 class FileContainer(BufferContainer):
@@ -95,47 +119,119 @@ class FileContainer(BufferContainer):
         self.fp = open(filename, 'rb')
         self.file = filename
         self.fill_trigger = fill_trigger
+        self.decoder = codecs.getincrementaldecoder('utf8')()
 
     def __del__(self):
         self.fp.close()
 
+    def read_bytes(self) -> Union[bytes, memoryview]:
+        return self.fp.read(self.buffer_size)
+
+    def decode_next(self) -> str:
+        # Multibyte characters split across reads are held back by the decoder until the rest arrives
+        while True:
+            data = self.read_bytes()
+            chunk = self.decoder.decode(data, len(data) == 0)
+            if len(chunk) > 0 or len(data) == 0:
+                return chunk
+
     def fill_buffer(self):
-        chunk = ''.join(reversed(self.fp.read(self.buffer_size).decode('utf8')))
-        self.buffer = chunk + self.buffer
+        # Drop everything that can no longer be rolled back to
+        keep = min(self.pos, self.reset_pos)
+        chunk = self.decode_next()
+        self.text = self.text[keep:] + chunk
+        self.pos -= keep
+        self.reset_pos -= keep
+        self.reset_additions = [(i - keep, n) for i, n in self.reset_additions]
 
     @property
     def error_name(self) -> str:
         return str(self.file)
 
     def is_empty(self) -> bool:
-        if len(self.buffer) < self.fill_trigger:
+        if len(self.text) - self.pos < self.fill_trigger:
             self.fill_buffer()
 
         return super().is_empty()
 
     def __len__(self) -> int:
-        if len(self.buffer) < self.fill_trigger:
+        if len(self.text) - self.pos < self.fill_trigger:
             self.fill_buffer()
 
         return super().__len__()
 
     def peek(self, n: int = 0) -> str:
-        if len(self.buffer) < self.fill_trigger:
+        if len(self.text) - self.pos < self.fill_trigger:
             self.fill_buffer()
 
         return super().peek(n)
 
     def read_char(self) -> str:
-        if len(self.buffer) < self.fill_trigger:
+        if len(self.text) - self.pos < self.fill_trigger:
             self.fill_buffer()
 
         return super().read_char()
 
+    def read_chunk(self, size: int) -> str:
+        if self.pos >= len(self.text):
+            # Nothing buffered, hand the decoded block straight over
+            self.text = self.decode_next()
+            self.pos = 0
+            if len(self.text) <= size:
+                chunk, self.text = self.text, ''
+                self.line += chunk.count('\n') + chunk.count('\f')
+                if len(chunk) > 0:
+                    self.line_start = chunk[-1] == '\n' or chunk[-1] == '\r'
+                self.set_reset_point()
+                return chunk
+        elif len(self.text) - self.pos < size:
+            self.fill_buffer()
+
+        return super().read_chunk(size)
+
+
+class MappedFileContainer(FileContainer):
+    """
+    Memory maps the file instead of reading it, blocks are decoded straight out of the mapping
+    and the pages behind them are released once they have been decoded,
+    so lexing a file keeps a bounded amount of it in memory no matter how large it is.
+    """
+
+    def __init__(self, filename: pathlib.Path, buffer_size: int = 1048576, fill_trigger: int = 10):
+        super().__init__(filename, buffer_size, fill_trigger)
+        self.offset = 0
+        self.released = 0
+        self.map = None
+        self.view = memoryview(b'')
+        if os.fstat(self.fp.fileno()).st_size > 0:
+            self.map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.map)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __del__(self):
+        self.view.release()
+        if self.map is not None:
+            self.map.close()
+        super().__del__()
+
+    def read_bytes(self) -> Union[bytes, memoryview]:
+        if self.map is not None and hasattr(mmap, 'MADV_DONTNEED'):
+            # Everything before the current page has been decoded already
+            done = self.offset - self.offset % mmap.PAGESIZE
+            if done > self.released:
+                self.map.madvise(mmap.MADV_DONTNEED, self.released, done - self.released)
+                self.released = done
+
+        data = self.view[self.offset:self.offset + self.buffer_size]
+        self.offset += len(data)
+        return data
+
 
 class StringContainer(BufferContainer):
     def __init__(self, data: str):
         super().__init__(len(data))
-        self.buffer = ''.join(list(reversed(data)))
+        self.text = data
 
     @property
     def error_name(self) -> str:
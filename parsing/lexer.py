@@ -1,7 +1,9 @@
 import pathlib
-from typing import List, Union
+import re
+from array import array
+from typing import List, Union, Optional, Tuple, Dict
 
-from .tokens import TokenController, Token
+from .tokens import TokenController, Token, TokenIndex
 from .bufferio import BufferContainer
 
 
@@ -17,6 +19,8 @@ class InvalidLexemeError(BaseException):
 
 
 class Lexeme:
+    __slots__ = ('code', 'token', 'line', 'file')
+
     def __init__(self, code: int, token: str, line: int = 0, file: pathlib.Path = None):
         self.code = code
         self.token = token
@@ -30,8 +34,6 @@ class Lexeme:
 class Lexer:
     def __init__(self, buffer: BufferContainer):
         self.buffer = buffer
-        self.reset_buffer: List[List[Lexeme]] = [[]]
-        self.lexeme_buffer: List[Lexeme] = []
 
     def __repr__(self):
         return '{}'.format(self.buffer)
@@ -45,28 +47,18 @@ class Lexer:
         self.buffer.reset()
 
     def find_matching_token(self, check_all: bool = False, return_comments: bool = False) -> Union[Token, None]:
-        vt = TokenController.get_instance()
+        index = TokenController.get_instance().get_index(check_all)
+
+        while True:
+            tok = index.match(self.buffer)
+            if tok is None or tok.code >= 0 or return_comments:
+                return tok
 
-        keep_going = True
-        while keep_going:
-            keep_going = False
-            for tok in (vt.enabled_tokens if not check_all else vt.tokens):
-                if tok.matches(self.buffer):
-                    self.buffer.reset()
-                    if tok.code >= 0 or return_comments:
-                        return tok
-                    else:
-                        # We found a comment lexeme
-                        tok.parse_file(self.buffer)
-                        self.strip_spaces()
-                        if self.buffer.is_empty():
-                            return None
-                        keep_going = True
-                    break
-                else:
-                    self.buffer.reset()
-
-        return None
+            # We found a comment lexeme
+            tok.parse_file(self.buffer)
+            self.strip_spaces()
+            if self.buffer.is_empty():
+                return None
 
     def has_next(self) -> bool:
         self.strip_spaces()
@@ -76,6 +68,9 @@ class Lexer:
 
         if self.find_matching_token(True) is not None:
             return True
+        elif self.buffer.is_empty():
+            # Only comments were left
+            return False
         elif self.find_matching_token(True, True) is not None:
             return False
         else:
@@ -87,12 +82,11 @@ class Lexer:
         if self.buffer.is_empty():
             return None
 
-        if len(self.lexeme_buffer) > 0:
-            lex = self.lexeme_buffer.pop(-1)
-            self.reset_buffer[-1].append(lex)
-            return lex
-
         tok = self.find_matching_token()
+        if tok is None and self.buffer.is_empty():
+            # Only comments were left
+            return None
+
         found = tok is not None
         if found:
             tline = self.buffer.line
@@ -100,7 +94,6 @@ class Lexer:
             lex = Lexeme(tok.code, lexeme, tline, self.buffer.error_name)
 
             if lex.code >= 0:
-                self.reset_buffer[-1].append(lex)
                 return lex
 
         if not found and not self.buffer.has_error:
@@ -112,20 +105,181 @@ class Lexer:
 
         self.buffer.set_reset_point()
 
-    def reset(self):
-        if len(self.reset_buffer) > 0:
-            self.lexeme_buffer += self.reset_buffer[-1]
-            self.reset_buffer[-1].clear()
 
-    def set_reset_point(self):
-        if len(self.reset_buffer) > 0:
-            self.reset_buffer[-1].clear()
+class TableLexer(Lexer):
+    """
+    Single pass lexer, every enabled token is combined into one compiled regex by the TokenIndex,
+    so each lexeme is only scanned once instead of trying every token in turn.
+    The buffer is consumed in chunks, only the unconsumed tail of the current chunk is kept around.
+    """
+
+    whitespace = re.compile(r'\s+')
+    lookahead = 32  # longer than any fixed length token
+
+    def __init__(self, buffer: BufferContainer, chunk_size: int = 1048576):
+        super().__init__(buffer)
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.line = buffer.line
+        self.eof = False
+        self.file = buffer.error_name
+
+        vt = TokenController.get_instance()
+        self.index = vt.enabled_index
+        self.all_index = vt.index
+        self.spaced_pattern = re.compile(r'\s*(?:{})'.format(self.index.pattern.pattern))
+
+    def fill(self):
+        chunk = self.buffer.read_chunk(self.chunk_size)
+        if len(chunk) == 0:
+            self.eof = True
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+
+    def advance(self, end: int):
+        text = self.text
+        self.line += text.count('\n', self.pos, end) + text.count('\f', self.pos, end)
+        self.pos = end
+
+    def is_empty(self) -> bool:
+        return self.eof and self.pos >= len(self.text)
+
+    def strip_spaces(self):
+        while True:
+            while not self.eof and len(self.text) - self.pos < self.lookahead:
+                self.fill()
+            m = self.whitespace.match(self.text, self.pos)
+            if m is None:
+                return
+            self.advance(m.end())
+            if self.eof or m.end() < len(self.text):
+                return
+
+    def match(self, index: TokenIndex) -> Tuple[Optional[Token], Optional[re.Match]]:
+        # Skips whitespace and comments, the match returned starts at the next lexeme
+        while True:
+            self.strip_spaces()
+            m = index.pattern.match(self.text, self.pos)
+            while m is not None and m.end() == len(self.text) and not self.eof:
+                # The lexeme might continue into the next chunk
+                self.fill()
+                m = index.pattern.match(self.text, self.pos)
+            if m is None:
+                return None, None
+
+            tok = index.group_tokens[m.lastindex - 1]
+            if tok is index.identifier:
+                tok = index.resolve_identifier(m.group())
+            if tok.code >= 0:
+                return tok, m
+            self.advance(m.end())
+
+    def has_next(self) -> bool:
+        self.strip_spaces()
+
+        if self.is_empty():
+            return False
+
+        if self.match(self.all_index)[0] is not None:
+            return True
+        elif self.is_empty():
+            return False
+        else:
+            raise InvalidLexemeError(self.file, self.line, self.text[self.pos])
+
+    def get_next(self) -> Union[Lexeme, None]:
+        # Lexemes are handed out and forgotten, the parser never goes back
+        t = self.scan()
+        if t is None:
+            return None
+        return Lexeme(t[0], t[1], t[2], self.file)
+
+    def scan(self) -> Optional[Tuple[int, str, int]]:
+        # Reads the code, text and line of the next lexeme in the source
+        text, pos = self.text, self.pos
+        if self.eof or len(text) - pos >= self.lookahead:
+            # Fast path, the whitespace before the lexeme is matched along with it
+            m = self.spaced_pattern.match(text, pos)
+            if m is not None and (self.eof or m.end() < len(text)):
+                i = m.lastindex
+                start, end = m.span(i)
+                tok = self.index.group_tokens[i - 1]
+                if tok is self.index.identifier:
+                    tok = self.index.resolve_identifier(text[start:end])
+                if tok.code >= 0:
+                    line = self.line + text.count('\n', pos, start) + text.count('\f', pos, start)
+                    self.line = line + text.count('\n', start, end) + text.count('\f', start, end)
+                    self.pos = end
+                    return tok.code, text[start:end], line
+
+        tok, m = self.match(self.index)
+        if m is None:
+            if self.is_empty():
+                return None
+            raise LexerError(self.file, self.line, self.text[self.pos])
+
+        line = self.line
+        self.advance(m.end())
+        return tok.code, m.group(), line
+
+
+class LexemeArray:
+    """Stores lexemes as parallel arrays of codes, texts and lines, Lexeme objects are only created on access"""
+
+    def __init__(self, file: str = ''):
+        self.codes = array('i')
+        self.tokens: List[str] = []
+        self.lines = array('I')
+        self.file = file
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Lexeme:
+        return Lexeme(self.codes[i], self.tokens[i], self.lines[i], self.file)
+
+    def append(self, code: int, token: str, line: int):
+        self.codes.append(code)
+        self.tokens.append(token)
+        self.lines.append(line)
+
+
+class TokenizedLexer(TableLexer):
+    """
+    Tokenizes the whole source up front into a LexemeArray, get_next walks a cursor over it.
+    A lexer error is raised once the parser reaches the offending lexeme, same as with the other lexers.
+    """
 
-    def add_reset_buffer(self):
-        self.reset_buffer.append([])
+    def __init__(self, buffer: BufferContainer, chunk_size: int = 1048576):
+        super().__init__(buffer, chunk_size)
+        self.lexemes = LexemeArray(self.file)
+        self.error: Optional[BaseException] = None
+        self.cursor = 0
+        self.tokenize()
+
+    def tokenize(self):
+        strings: Dict[str, str] = {}
+        lexemes = self.lexemes
+        try:
+            t = self.scan()
+            while t is not None:
+                code, token, line = t
+                lexemes.append(code, strings.setdefault(token, token), line)
+                t = self.scan()
+        except LexerError as e:
+            self.error = e
+
+    def has_next(self) -> bool:
+        if self.cursor >= len(self.lexemes) and self.error is not None:
+            raise self.error
+        return self.cursor < len(self.lexemes)
+
+    def get_next(self) -> Union[Lexeme, None]:
+        if self.cursor >= len(self.lexemes):
+            if self.error is not None:
+                raise self.error
+            return None
 
-    def pop_reset_buffer(self):
-        if len(self.reset_buffer) > 0:
-            pt = self.reset_buffer.pop(-1)
-            if len(self.reset_buffer) > 0:
-                self.reset_buffer[-1] += pt
+        self.cursor += 1
+        return self.lexemes[self.cursor - 1]
@@ -1,5 +1,5 @@
 from copy import deepcopy, copy
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Iterable, Optional, Union
 from enum import Enum
 
 from .lexer import Lexer, Lexeme
@@ -79,11 +79,37 @@ class ASTNode:
     def __init__(self, code: int):
         self.code = code
 
+    def parts(self) -> List[Union[Lexeme, 'ASTNode']]:
+        # The lexemes of the node in source order, with its children in their place
+        return []
+
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable['ASTNode']:
+        # Appends the commands of the node to code, every child it yields is emitted in full before it carries on
+        return ()
+
     def traverse(self) -> List[Lexeme]:
-        pass
+        # Walks the tree with an explicit stack, like the parser, so deeply nested programs don't hit the recursion limit
+        result = []
+        stack: List[Union[Lexeme, ASTNode]] = [self]
+        while len(stack) > 0:
+            part = stack.pop(-1)
+            if isinstance(part, ASTNode):
+                stack += reversed(part.parts())
+            else:
+                result.append(part)
+        return result
 
     def compile(self, env: Environment) -> List[TuringCommand]:
-        pass
+        # Post order with a stack of the emitters still waiting on a child
+        code = []
+        emitters = [iter(self.emit(env, code))]
+        while len(emitters) > 0:
+            child = next(emitters[-1], None)
+            if child is None:
+                emitters.pop(-1)
+            else:
+                emitters.append(iter(child.emit(env, code)))
+        return code
 
 
 class TypeEnum(Enum):
@@ -105,11 +131,11 @@ class NestedExpressionAST(ExpressionAST):
         self.lp = lp
         self.rp = rp
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.lp] + self.inner.traverse() + [self.rp]
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.lp, self.inner, self.rp]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return self.inner.compile(env)
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.inner
 
 
 class BinaryOperatorExpression(ExpressionAST):
@@ -121,29 +147,28 @@ class BinaryOperatorExpression(ExpressionAST):
         self.lhs = lhs
         self.rhs = rhs
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.operator] + self.lhs.traverse() + self.rhs.traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.operator, self.lhs, self.rhs]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        result = []
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.lhs
+        yield self.rhs
         if self.operator.code == ord('='):
-            result.append(EqualsComparison())
+            code.append(EqualsComparison())
         elif self.operator.code == ord('<'):
-            result.append(LessComparison())
+            code.append(LessComparison())
         elif self.operator.code == ord('>'):
-            result.append(GreaterComparison())
+            code.append(GreaterComparison())
         elif self.operator.code == ord('|'):
-            result.append(OrComparison())
+            code.append(OrComparison())
         elif self.operator.code == ord('&'):
-            result.append(AndComparison())
-        elif self.operator.code == 310:
-            result.append(NotEqualsComparison())
-        elif self.operator.code == 313:
-            result.append(LessEqualsComparison())
+            code.append(AndComparison())
+        elif self.operator.code == 311:
+            code.append(NotEqualsComparison())
         elif self.operator.code == 314:
-            result.append(GreaterEqualsComparison())
-        result = self.lhs.compile(env) + self.rhs.compile(env) + result
-        return result
+            code.append(LessEqualsComparison())
+        elif self.operator.code == 315:
+            code.append(GreaterEqualsComparison())
 
 
 class UnaryOperatorExpression(ExpressionAST):
@@ -154,11 +179,12 @@ class UnaryOperatorExpression(ExpressionAST):
         self.operator = operator
         self.rhs = rhs
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.operator] + self.rhs.traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.operator, self.rhs]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return self.rhs.compile(env) + [NegationComparison()]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.rhs
+        code.append(NegationComparison())
 
 
 class ReadExpression(ExpressionAST):
@@ -166,11 +192,12 @@ class ReadExpression(ExpressionAST):
         super().__init__(TypeEnum.CHARACTER, command.code)
         self.command = command
 
-    def traverse(self) -> List[Lexeme]:
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
         return [self.command]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return [ReadCommand()]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        code.append(ReadCommand())
+        return ()
 
 
 class PrimitiveExpression(ExpressionAST):
@@ -178,10 +205,10 @@ class PrimitiveExpression(ExpressionAST):
         super().__init__(t, lex.code)
         self.lex = lex
 
-    def traverse(self) -> List[Lexeme]:
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
         return [self.lex]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
         if self.code == 301:
             v = Numeric(int(self.lex.token))
         elif self.code == 300:
@@ -190,7 +217,8 @@ class PrimitiveExpression(ExpressionAST):
             v = Boolean(self.lex.token == 'true')
         else:
             v = None
-        return [ValueCommand(v)]
+        code.append(ValueCommand(v))
+        return ()
 
 
 class StatementAST(ASTNode):
@@ -204,17 +232,11 @@ class StatementBlockAST(ASTNode):
         self.lb = lb
         self.rb = rb
 
-    def traverse(self) -> List[Lexeme]:
-        result = [self.lb]
-        for s in self.statements:
-            result += s.traverse()
-        return result + [self.rb]
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.lb] + self.statements + [self.rb]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        result = []
-        for s in self.statements:
-            result += s.compile(env)
-        return result
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        return self.statements
 
 
 class SemicolonStatementAST(StatementAST):
@@ -222,23 +244,21 @@ class SemicolonStatementAST(StatementAST):
         super().__init__(semi.code)
         self.semi = semi
 
-    def traverse(self) -> List[Lexeme]:
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
         return [self.semi]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return []
-
 
 class HaltStatementAST(SemicolonStatementAST):
     def __init__(self, halt: Lexeme, semi: Lexeme):
         super().__init__(semi)
         self.halt = halt
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.halt] + super().traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.halt] + super().parts()
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return [HaltCommand()]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        code.append(HaltCommand())
+        return ()
 
 
 class MoveStatementAST(SemicolonStatementAST):
@@ -249,12 +269,12 @@ class MoveStatementAST(SemicolonStatementAST):
         self.number = number
         self.command = command
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.command] + self.number.traverse() + super().traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.command, self.number] + super().parts()
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return super().compile(env) + self.number.compile(env) + \
-               [MoveCommand(CommandEnum.LEFT if self.command.code in [309, 312] else CommandEnum.RIGHT)]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.number
+        code.append(MoveCommand(CommandEnum.LEFT if self.command.code in [309, 312] else CommandEnum.RIGHT))
 
 
 class WriteStatementAST(SemicolonStatementAST):
@@ -265,11 +285,12 @@ class WriteStatementAST(SemicolonStatementAST):
         self.char = c
         self.command = command
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.command] + self.char.traverse() + super().traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.command, self.char] + super().parts()
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return self.char.compile(env) + [WriteCommand()]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.char
+        code.append(WriteCommand())
 
 
 class GotoStatementAST(SemicolonStatementAST):
@@ -280,11 +301,12 @@ class GotoStatementAST(SemicolonStatementAST):
         if self.identifier.token not in env:
             raise ParserError(ident, '{} is not defined as a function'.format(ident.token))
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.goto, self.identifier] + super().traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.goto, self.identifier] + super().parts()
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        return [CallCommand(self.identifier.token)]
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        code.append(CallCommand(self.identifier.token))
+        return ()
 
 
 class ControlFlowStatementAST(StatementAST):
@@ -298,17 +320,22 @@ class ControlFlowStatementAST(StatementAST):
         self.exp = cond
         self.sb = sb
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.contr, self.lp] + self.exp.traverse() + [self.rp] + self.sb.traverse()
-
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        sbc = self.sb.compile(env)
-        expc = self.exp.compile(env)
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.contr, self.lp, self.exp, self.rp, self.sb]
+
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        # Jumps are relative, the one over the block is filled in once the block is emitted
+        start = len(code)
+        yield self.exp
+        code.append(NegationComparison())
+        jump = len(code)
+        code.append(None)
+        yield self.sb
         if self.code == 305:
-            return expc + [NegationComparison(), CondJumpCommand(len(sbc) + 1)] + sbc + \
-                   [JumpCommand(-(len(sbc) + 2 + len(expc)))]
+            code[jump] = CondJumpCommand(len(code) - jump)
+            code.append(JumpCommand(start - len(code)))
         else:
-            return expc + [NegationComparison(), CondJumpCommand(len(sbc))] + sbc
+            code[jump] = CondJumpCommand(len(code) - jump - 1)
 
 
 class ElseControlFlowStatementAST(ControlFlowStatementAST):
@@ -318,15 +345,17 @@ class ElseControlFlowStatementAST(ControlFlowStatementAST):
         self.el = el
         self.esb = esb
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.contr, self.lp] + self.exp.traverse() + [self.rp] + self.sb.traverse()
-
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        sbc = self.sb.compile(env)
-        expc = self.exp.compile(env)
-        esbc = self.esb.compile(env)
-        return expc + [DuplicateStackCommand(), NegationComparison(), CondJumpCommand(len(sbc))] + sbc + \
-               [CondJumpCommand(len(esbc))] + esbc
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        yield self.exp
+        code += [DuplicateStackCommand(), NegationComparison()]
+        jump = len(code)
+        code.append(None)
+        yield self.sb
+        code[jump] = CondJumpCommand(len(code) - jump - 1)
+        jump = len(code)
+        code.append(None)
+        yield self.esb
+        code[jump] = CondJumpCommand(len(code) - jump - 1)
 
 
 class FunctionDefinitionAST(ASTNode):
@@ -337,12 +366,15 @@ class FunctionDefinitionAST(ASTNode):
         self.sb = sb
         env[self.name.token] = self.sb
 
-    def traverse(self) -> List[Lexeme]:
-        return [self.name, self.colon] + self.sb.traverse()
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return [self.name, self.colon, self.sb]
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        env[self.name.token] = self.sb.compile(env)
-        return []
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        # The body is kept apart under the name of the function
+        start = len(code)
+        yield self.sb
+        env[self.name.token] = code[start:]
+        del code[start:]
 
 
 class ProgramAST(ASTNode):
@@ -350,24 +382,48 @@ class ProgramAST(ASTNode):
         super().__init__(0)
         self.statements = statements
 
-    def traverse(self) -> List[Lexeme]:
-        result = []
-        for s in self.statements:
-            result += s.traverse()
-        return result
+    def parts(self) -> List[Union[Lexeme, ASTNode]]:
+        return self.statements
 
-    def compile(self, env: Environment) -> List[TuringCommand]:
-        result = []
-        for s in self.statements:
-            result += s.compile(env)
-        return result
+    def emit(self, env: Environment, code: List[TuringCommand]) -> Iterable[ASTNode]:
+        return self.statements
+
+
+expression_operators = set(map(ord, '<>=!|&')) | {311, 314, 315}
+move_commands = {309, 310, 312, 313}
+
+# Frames kept on the parser stack
+ROOT_STATEMENT = 0  # parsing a single statement
+ROOT_BLOCK = 1  # parsing a single statement block
+FUNCTION = 2  # [FUNCTION, identifier, colon], waiting on the function body
+CONTROL = 3  # [CONTROL, contr, lp, rp, cond, block, else], waiting on the block or else block
+BLOCK = 4  # [BLOCK, lb, statements], an open statement block
 
 
 class AST:
+    """
+    Predictive parser, the grammar is LL(1) so a single lexeme of lookahead decides every production.
+    Expressions are reduced on an operator stack and nested statement blocks are kept on a frame stack,
+    so nesting depth is not limited by the recursion limit and no lexeme is ever read twice.
+    """
+
     def __init__(self, lexer: Lexer):
         self.root = None
         self.env = Environment()
         self.lexer = lexer
+        self.lookahead: Optional[Lexeme] = None
+        self.peeked = False
+
+    def peek(self) -> Optional[Lexeme]:
+        if not self.peeked:
+            self.lookahead = self.lexer.get_next()
+            self.peeked = True
+        return self.lookahead
+
+    def take(self) -> Optional[Lexeme]:
+        eme = self.peek()
+        self.peeked = False
+        return eme
 
     def build_tree(self):
         statements = []
@@ -385,149 +441,174 @@ class AST:
         self.root = ProgramAST(statements)
 
     def parse_expression(self) -> Optional[ExpressionAST]:
-        self.lexer.add_reset_buffer()
-        eme = self.lexer.get_next()
-        if eme is not None:
-            if eme.code in list(map(ord, '<>=!|&')) + [311, 314, 315]:
-                # We found an operator
-                expa = self.parse_expression()
-                if expa is not None:
-                    if eme.code == ord('!'):
-                        self.lexer.pop_reset_buffer()
-                        return UnaryOperatorExpression(eme, expa)
-                    expb = self.parse_expression()
-                    if expb is not None:
-                        self.lexer.pop_reset_buffer()
-                        return BinaryOperatorExpression(eme, expa, expb)
-                    raise ParserError(eme, 'Missing second expression for binary operator')
-                raise ParserError(eme, 'Missing first expression for binary operator')
-            elif eme.code in [ord('^'), 306]:
-                self.lexer.pop_reset_buffer()
-                return ReadExpression(eme)
-            elif eme.code == ord('('):
-                exp = self.parse_expression()
-                if exp is not None:
-                    pr = self.lexer.get_next()
-                    if pr.code == ord(')'):
-                        self.lexer.pop_reset_buffer()
-                        return NestedExpressionAST(exp, eme, pr)
-                    raise ParserError(eme, 'Unmatched (')
-                raise ParserError(eme, 'Unfilled nested expression')
-            elif eme.code in [300, 301]:
-                self.lexer.pop_reset_buffer()
-                return PrimitiveExpression(eme, TypeEnum.CHARACTER if eme.code == 300 else TypeEnum.NUMBER)
-            elif eme.code in [316, 317]:
-                self.lexer.pop_reset_buffer()
-                return PrimitiveExpression(eme, TypeEnum.BOOLEAN)
-        self.lexer.reset()
-        self.lexer.pop_reset_buffer()
-        return None
-
-    def parse_statement(self) -> Optional[StatementAST]:
-        self.lexer.add_reset_buffer()
-        eme = self.lexer.get_next()
-        if eme is not None:
-            if eme.code == ord(';'):
-                self.lexer.pop_reset_buffer()
-                return SemicolonStatementAST(eme)
-            elif eme.code in [309, 310, 312, 313]:
-                num = self.parse_expression()
-                if num is not None:
-                    semi = self.lexer.get_next()
-                    if semi is not None and semi.code == ord(';'):
-                        self.lexer.pop_reset_buffer()
-                        return MoveStatementAST(semi, num, eme)
-                    raise ParserError(eme, 'Missing Semicolon')
-                raise ParserError(eme, 'Move command missing numeric expression')
-            elif eme.code == 307:
-                lit = self.parse_expression()
-                if lit is not None:
-                    semi = self.lexer.get_next()
-                    if semi is not None and semi.code == ord(';'):
-                        self.lexer.pop_reset_buffer()
-                        return WriteStatementAST(semi, lit, eme)
-                    raise ParserError(eme, 'Missing Semicolon')
-                raise ParserError(eme, 'Write command without a character expression')
-            elif eme.code == 308:
-                lit = self.lexer.get_next()
-                if lit is not None and lit.code == 302:
-                    semi = self.lexer.get_next()
-                    if semi is not None and semi.code == ord(';'):
-                        self.lexer.pop_reset_buffer()
-                        return GotoStatementAST(eme, lit, semi, self.env)
-                    raise ParserError(eme, 'Missing Semicolon')
-                raise ParserError(eme, 'Goto command without a target')
-            elif eme.code in [303, 305]:
-                # flow control
-                pl = self.lexer.get_next()
-                if pl is not None and pl.code == ord('('):
-                    exp = self.parse_expression()
-                    if exp is not None:
-                        pr = self.lexer.get_next()
-                        if pr is not None and pr.code == ord(')'):
-                            sb = self.parse_statement_block()
-                            if sb is not None:
-                                if eme.code == 303:
-                                    self.lexer.add_reset_buffer()
-                                    elp = self.lexer.get_next()
-                                    if elp is not None and elp.code == 304:
-                                        esb = self.parse_statement_block()
-                                        if esb is not None:
-                                            self.lexer.pop_reset_buffer()
-                                            return ElseControlFlowStatementAST(eme, pl, pr, exp, sb, elp, esb)
-                                        raise ParserError(elp, 'Missing else statement block')
-                                    self.lexer.reset()
-                                    self.lexer.pop_reset_buffer()
-                                self.lexer.pop_reset_buffer()
-                                return ControlFlowStatementAST(eme, pl, pr, exp, sb)
-                            raise ParserError(pr, 'Missing Statement block')
-                        raise ParserError(pl, 'Unmatched (')
-                    raise ParserError(pl, 'Missing conditional statement')
-                raise ParserError(eme, 'Missing (')
-            elif eme.code == 318:
-                semi = self.lexer.get_next()
+        # Operators waiting on their operands, as [operator, first operand] pairs
+        pending = []
+        while True:
+            eme = self.peek()
+            exp = None
+            if eme is not None:
+                if eme.code in expression_operators or eme.code == ord('('):
+                    self.take()
+                    pending.append([eme, None])
+                    continue
+                elif eme.code in [ord('^'), 306]:
+                    self.take()
+                    exp = ReadExpression(eme)
+                elif eme.code in [300, 301]:
+                    self.take()
+                    exp = PrimitiveExpression(eme, TypeEnum.CHARACTER if eme.code == 300 else TypeEnum.NUMBER)
+                elif eme.code in [316, 317]:
+                    self.take()
+                    exp = PrimitiveExpression(eme, TypeEnum.BOOLEAN)
+
+            # Reduce every operator that is now complete
+            while len(pending) > 0:
+                op, first = pending[-1]
+                if op.code == ord('('):
+                    if exp is None:
+                        raise ParserError(op, 'Unfilled nested expression')
+                    pr = self.take()
+                    if pr is None or pr.code != ord(')'):
+                        raise ParserError(op, 'Unmatched (')
+                    exp = NestedExpressionAST(exp, op, pr)
+                elif first is None:
+                    if exp is None:
+                        raise ParserError(op, 'Missing first expression for binary operator')
+                    if op.code != ord('!'):
+                        pending[-1][1] = exp
+                        break
+                    exp = UnaryOperatorExpression(op, exp)
+                else:
+                    if exp is None:
+                        raise ParserError(op, 'Missing second expression for binary operator')
+                    exp = BinaryOperatorExpression(op, first, exp)
+                pending.pop(-1)
+            else:
+                return exp
+
+    def parse_simple_statement(self, eme: Lexeme) -> StatementAST:
+        if eme.code == ord(';'):
+            return SemicolonStatementAST(eme)
+        elif eme.code in move_commands:
+            num = self.parse_expression()
+            if num is not None:
+                semi = self.take()
                 if semi is not None and semi.code == ord(';'):
-                    self.lexer.pop_reset_buffer()
-                    return HaltStatementAST(eme, semi)
+                    return MoveStatementAST(semi, num, eme)
                 raise ParserError(eme, 'Missing Semicolon')
-        self.lexer.reset()
-        self.lexer.pop_reset_buffer()
-        return None
+            raise ParserError(eme, 'Move command missing numeric expression')
+        elif eme.code == 307:
+            lit = self.parse_expression()
+            if lit is not None:
+                semi = self.take()
+                if semi is not None and semi.code == ord(';'):
+                    return WriteStatementAST(semi, lit, eme)
+                raise ParserError(eme, 'Missing Semicolon')
+            raise ParserError(eme, 'Write command without a character expression')
+        elif eme.code == 308:
+            lit = self.take()
+            if lit is not None and lit.code == 302:
+                semi = self.take()
+                if semi is not None and semi.code == ord(';'):
+                    return GotoStatementAST(eme, lit, semi, self.env)
+                raise ParserError(eme, 'Missing Semicolon')
+            raise ParserError(eme, 'Goto command without a target')
+        else:
+            semi = self.take()
+            if semi is not None and semi.code == ord(';'):
+                return HaltStatementAST(eme, semi)
+            raise ParserError(eme, 'Missing Semicolon')
+
+    def parse_control_flow(self, eme: Lexeme) -> list:
+        # Parses everything up to the statement block
+        pl = self.take()
+        if pl is not None and pl.code == ord('('):
+            exp = self.parse_expression()
+            if exp is not None:
+                pr = self.take()
+                if pr is not None and pr.code == ord(')'):
+                    return [CONTROL, eme, pl, pr, exp, None, None]
+                raise ParserError(pl, 'Unmatched (')
+            raise ParserError(pl, 'Missing conditional statement')
+        raise ParserError(eme, 'Missing (')
+
+    def parse_nested(self, stack: List[list]) -> Optional[ASTNode]:
+        want_block = stack[0][0] != ROOT_STATEMENT
+        while True:
+            if want_block:
+                lb = self.peek()
+                if lb is None or lb.code != ord('{'):
+                    frame = stack[-1]
+                    if frame[0] == ROOT_BLOCK:
+                        return None
+                    elif frame[0] == FUNCTION:
+                        raise ParserError(frame[2], 'Function name missing statement block')
+                    elif frame[5] is None:
+                        raise ParserError(frame[3], 'Missing Statement block')
+                    raise ParserError(frame[6], 'Missing else statement block')
+                self.take()
+                self.env.nest()
+                stack.append([BLOCK, lb, []])
+                want_block = False
+
+            eme = self.peek()
+            if eme is not None and eme.code in [303, 305]:
+                self.take()
+                stack.append(self.parse_control_flow(eme))
+                want_block = True
+                continue
+            elif eme is not None and (eme.code in move_commands or eme.code in [ord(';'), 307, 308, 318]):
+                self.take()
+                node = self.parse_simple_statement(eme)
+            elif stack[-1][0] == ROOT_STATEMENT:
+                return None
+            else:
+                # The end of the innermost block, pass it up to whatever it belongs to
+                _, lb, statements = stack.pop(-1)
+                rb = self.take()
+                if rb is None:
+                    raise ParserError(lb, 'Unmatched {')
+                node = StatementBlockAST(statements, lb, rb)
+
+                frame = stack[-1]
+                if frame[0] == ROOT_BLOCK:
+                    return node
+                elif frame[0] == FUNCTION:
+                    return FunctionDefinitionAST(frame[1], frame[2], node, self.env)
+                elif frame[5] is None:
+                    frame[5] = node
+                    if frame[1].code == 303:
+                        el = self.peek()
+                        if el is not None and el.code == 304:
+                            frame[6] = self.take()
+                            want_block = True
+                            continue
+                    node = ControlFlowStatementAST(frame[1], frame[2], frame[3], frame[4], node)
+                else:
+                    node = ElseControlFlowStatementAST(frame[1], frame[2], frame[3], frame[4], frame[5],
+                                                       frame[6], node)
+                stack.pop(-1)
+
+            # A complete statement goes into the enclosing block
+            if stack[-1][0] == ROOT_STATEMENT:
+                return node
+            stack[-1][2].append(node)
+
+    def parse_statement(self) -> Optional[StatementAST]:
+        return self.parse_nested([[ROOT_STATEMENT]])
 
     def parse_statement_block(self) -> Optional[StatementBlockAST]:
-        self.lexer.add_reset_buffer()
-        rb = self.lexer.get_next()
-        if rb is not None and rb.code == ord('{'):
-            self.env.nest()
-            statements = []
-            stat = self.parse_statement()
-            while stat is not None:
-                statements.append(stat)
-                stat = self.parse_statement()
-            lb = self.lexer.get_next()
-            if lb is not None:
-                self.lexer.pop_reset_buffer()
-                return StatementBlockAST(statements, rb, lb)
-            raise ParserError(rb, 'Unmatched {')
-        self.lexer.reset()
-        self.lexer.pop_reset_buffer()
-        return None
+        return self.parse_nested([[ROOT_BLOCK]])
 
     def parser_function_definition(self) -> Optional[FunctionDefinitionAST]:
-        self.lexer.add_reset_buffer()
-        ident = self.lexer.get_next()
+        ident = self.peek()
         if ident is not None and ident.code == 302:
-            colon = self.lexer.get_next()
+            self.take()
+            colon = self.take()
             if colon is not None and colon.code == ord(':'):
                 self.env[ident.token] = None
-                sb = self.parse_statement_block()
-                if sb is not None:
-                    self.lexer.pop_reset_buffer()
-                    return FunctionDefinitionAST(ident, colon, sb, self.env)
-                raise ParserError(colon, 'Function name missing statement block')
+                return self.parse_nested([[FUNCTION, ident, colon]])
             raise ParserError(ident, 'Function name missing colon')
-        self.lexer.reset()
-        self.lexer.pop_reset_buffer()
         return None
 
     def compile(self) -> List[TuringCommand]:
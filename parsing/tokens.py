@@ -1,13 +1,28 @@
-from typing import List
+import re
+from typing import List, Dict, Optional
 
 from .bufferio import BufferContainer
 
 
 class Token:
+    generation = 0  # bumped whenever a token is created or enabled/disabled
+
     def __init__(self, code: int, pattern: str):
         self.code = code
         self.pattern = pattern
-        self.enabled = True
+        self.regex = re.escape(pattern)
+        self.first_characters = pattern[:1]
+        self._enabled = True
+        Token.generation += 1
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self._enabled = value
+        Token.generation += 1
 
     def matches(self, s: BufferContainer) -> bool:
         pass
@@ -41,6 +56,8 @@ class SimpleStringToken(Token):
 class LiteralToken(Token):
     def __init__(self):
         super().__init__(300, r"'.+'")
+        self.regex = r"'[\s\S]'"
+        self.first_characters = "'"
 
     def matches(self, s: BufferContainer) -> bool:
         if s.read_char() == "'":
@@ -68,6 +85,8 @@ class LiteralToken(Token):
 class CommentToken(Token):
     def __init__(self):
         super().__init__(-1, r"#.+\n")
+        self.regex = r"#[^\n\f]*[\n\f]?"
+        self.first_characters = "#"
 
     def matches(self, s: BufferContainer) -> bool:
         if s.read_char() == "#":
@@ -97,6 +116,9 @@ class IdentifierToken(Token):
         super().__init__(302, r"[^0-9][_a-zA-Z]+[_a-zA-Z0-9]*")
         self.initial_character_string = "_abcdefghijklmnopqrstuvwxyABCDEFGHIJKLMNOPQRSTUVWXYZ"
         self.accepting_character_string = self.initial_character_string + '0123456789'
+        self.regex = '[{}][{}]*'.format(re.escape(self.initial_character_string),
+                                        re.escape(self.accepting_character_string))
+        self.first_characters = self.initial_character_string
 
     def matches(self, s: BufferContainer) -> bool:
         if s.read_char() in self.initial_character_string:
@@ -126,6 +148,8 @@ class IntegerLiteralToken(Token):
     def __init__(self):
         super().__init__(301, r"\d+")
         self.digits = '0123456789'
+        self.regex = '[0-9]+'
+        self.first_characters = self.digits
 
     def matches(self, s: BufferContainer) -> bool:
         if s.read_char() in self.digits:
@@ -156,16 +180,112 @@ class SingleCharToken(SimpleStringToken):
         super().__init__(ord(c), c)
 
 
+class TokenIndex:
+    """
+    Lookup structures for a fixed set of tokens.
+    Fixed strings are resolved by walking a trie, identifiers are read whole and then looked up as keywords,
+    everything else is found through the first character, so the longest possible lexeme always wins.
+    """
+
+    def __init__(self, tokens: List[Token]):
+        self.trie: Dict = {}
+        self.keywords: Dict[str, Token] = {}
+        self.identifier: Optional[IdentifierToken] = None
+        self.first_characters: Dict[str, List[Token]] = {}
+
+        strings = []
+        for t in tokens:
+            if isinstance(t, SimpleStringToken):
+                strings.append(t)
+            elif isinstance(t, IdentifierToken):
+                if self.identifier is None:
+                    self.identifier = t
+            else:
+                for c in t.first_characters:
+                    self.first_characters.setdefault(c, []).append(t)
+
+        ident = re.compile(self.identifier.regex) if self.identifier is not None else None
+        for t in strings:
+            if ident is not None and ident.fullmatch(t.pattern):
+                self.keywords.setdefault(t.pattern, t)
+            else:
+                node = self.trie
+                for c in t.pattern:
+                    node = node.setdefault(c, {})
+                node.setdefault('', t)
+
+        # The same rules as one regex, longer strings are tried first and identifiers get looked up afterwards
+        self.group_tokens: List[Token] = sorted([t for t in strings if t.pattern not in self.keywords],
+                                                key=lambda t: -len(t.pattern))
+        self.group_tokens += [t for t in tokens if not isinstance(t, SimpleStringToken)]
+        self.pattern = re.compile('|'.join('({})'.format(t.regex) for t in self.group_tokens))
+
+    def resolve_identifier(self, word: str) -> Token:
+        return self.keywords.get(word, self.identifier)
+
+    def match(self, s: BufferContainer) -> Optional[Token]:
+        c = s.peek(-1)
+        if c == '':
+            return None
+
+        if self.identifier is not None and c in self.identifier.initial_character_string:
+            word = self.identifier.parse_file(s)
+            s.reset()
+            return self.resolve_identifier(word)
+
+        node = self.trie
+        best = None
+        while c != '' and c in node:
+            node = node[c]
+            s.read_char()
+            best = node.get('', best)
+            c = s.peek(-1)
+        s.reset()
+        if best is not None:
+            return best
+
+        for tok in self.first_characters.get(c, []):
+            if tok.matches(s):
+                return tok
+        return None
+
+
 class TokenController:
     instance = None
 
     def __init__(self):
         self.tokens: List[Token] = []
+        self.generation = -1
+        self._enabled_tokens: List[Token] = []
+        self._enabled_index: Optional[TokenIndex] = None
+        self._index: Optional[TokenIndex] = None
         self.generate_tokens()
 
+    def refresh(self):
+        # Rebuilds the indices after tokens were added, enabled or disabled
+        if self.generation != Token.generation:
+            self.generation = Token.generation
+            self._enabled_tokens = [t for t in self.tokens if t.enabled]
+            self._enabled_index = TokenIndex(self._enabled_tokens)
+            self._index = TokenIndex(self.tokens)
+
     @property
     def enabled_tokens(self) -> List[Token]:
-        return [t for t in self.tokens if t.enabled]
+        self.refresh()
+        return self._enabled_tokens
+
+    @property
+    def enabled_index(self) -> TokenIndex:
+        self.refresh()
+        return self._enabled_index
+
+    @property
+    def index(self) -> TokenIndex:
+        self.refresh()
+        return self._index
+
+    def get_index(self, check_all: bool = False) -> TokenIndex:
+        return self.index if check_all else self.enabled_index
 
     @staticmethod
     def get_instance():
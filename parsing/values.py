@@ -17,6 +17,16 @@ class Value:
             return other.value > self.value
         return False
 
+    def __le__(self, other):
+        if isinstance(other, Value):
+            return other.value <= self.value
+        return False
+
+    def __ge__(self, other):
+        if isinstance(other, Value):
+            return other.value >= self.value
+        return False
+
     def __repr__(self):
         return repr(self.value)
 
@@ -5,7 +5,7 @@ import json
 
 from parsing.bufferio import StringContainer
 from parsing.commander import Commander
-from parsing.lexer import Lexer
+from parsing.lexer import TokenizedLexer
 from parsing.parser import AST
 from turing.environment import TheTape
 from turing.machine import TuringMachine
@@ -64,7 +64,7 @@ async def hello(websocket: wserver.WebSocketServerProtocol, path):
 
                     tape.reset(True)
 
-                    code = AST(Lexer(StringContainer(code)))
+                    code = AST(TokenizedLexer(StringContainer(code)))
                     code.build_tree()
 
                     commander = Commander(code)
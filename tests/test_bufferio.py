@@ -0,0 +1,115 @@
+import pathlib
+import tempfile
+import unittest
+
+from parsing.bufferio import FileContainer, MappedFileContainer, StringContainer
+from parsing.lexer import TableLexer
+
+
+def read_all(buffer) -> str:
+    result = ''
+    c = buffer.read_char()
+    while c != '':
+        result += c
+        c = buffer.read_char()
+    return result
+
+
+def lexemes(lexer) -> list:
+    result = []
+    lex = lexer.get_next()
+    while lex is not None:
+        result.append((lex.code, lex.token, lex.line))
+        lex = lexer.get_next()
+    return result
+
+
+class TestBufferContainer(unittest.TestCase):
+    def test_reset(self):
+        buffer = StringContainer('ab\ncd\nef')
+        buffer.read_char()
+        buffer.set_reset_point()
+        self.assertEqual(buffer.read_char() + buffer.read_char() + buffer.read_char(), 'b\nc')
+        self.assertEqual(buffer.line, 2)
+        self.assertEqual(buffer.reset_point, 'b\nc')
+        buffer.reset()
+        self.assertEqual(buffer.line, 1)
+        self.assertEqual(read_all(buffer), 'b\ncd\nef')
+        self.assertEqual(buffer.line, 3)
+        self.assertTrue(buffer.is_empty())
+
+    def test_peek(self):
+        buffer = StringContainer('abc')
+        buffer.read_char()
+        # Like the reversed buffer, 0 is the last character and -1 the next one
+        self.assertEqual([buffer.peek(0), buffer.peek(-1), buffer.peek(-2), buffer.peek(-3), buffer.peek(5)],
+                         ['c', 'b', 'c', '', ''])
+        self.assertEqual(buffer.buffer, 'cb')
+        self.assertEqual(len(buffer), 2)
+
+    def test_push_str(self):
+        buffer = StringContainer('abcd')
+        buffer.set_reset_point()
+        buffer.read_char()
+        buffer.push_str('xy')
+        self.assertEqual(buffer.read_char() + buffer.read_char(), 'xy')
+        buffer.reset()
+        self.assertEqual(read_all(buffer), 'abcd')
+
+        # Handing back characters that were read, the line count goes back with them
+        buffer = StringContainer('a\nbc')
+        buffer.set_reset_point()
+        self.assertEqual(buffer.read_char() + buffer.read_char() + buffer.read_char(), 'a\nb')
+        buffer.push_str('\nb', False)
+        self.assertEqual(buffer.line, 1)
+        self.assertEqual(read_all(buffer), '\nbc')
+        self.assertEqual(buffer.line, 2)
+
+    def test_file_refills(self):
+        text = ''.join('line {}\n'.format(i) for i in range(200))
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'source.bt'
+            path.write_text(text)
+            buffer = FileContainer(path, buffer_size=16)
+            buffer.set_reset_point()
+            first = ''.join(buffer.read_char() for _ in range(100))
+            # Rolling back over several refills
+            buffer.reset()
+            self.assertEqual(''.join(buffer.read_char() for _ in range(100)), first)
+            self.assertEqual(first + read_all(buffer), text)
+            self.assertEqual(buffer.line, 201)
+
+
+class TestMappedFileContainer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name) / 'source.bt'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_multibyte_across_blocks(self):
+        # Characters of 2, 3 and 4 bytes land on every offset of the 5 byte blocks
+        text = "# \u00e9\u20ac\U0001f600 comment\nwrite '\u00e9';\n" * 20
+        self.path.write_text(text, encoding='utf8')
+        for container in (FileContainer, MappedFileContainer):
+            with self.subTest(container=container.__name__):
+                buffer = container(self.path, buffer_size=5)
+                self.assertEqual(read_all(buffer), text)
+                self.assertEqual(buffer.line, 41)
+
+    def test_lexer_chunks(self):
+        text = ''.join("l{0}: {{ write '\u00e9'; right {0}; }}\n".format(i) for i in range(300))
+        self.path.write_text(text, encoding='utf8')
+        self.assertEqual(lexemes(TableLexer(MappedFileContainer(self.path, buffer_size=7), chunk_size=11)),
+                         lexemes(TableLexer(StringContainer(text))))
+
+    def test_empty_file(self):
+        self.path.write_bytes(b'')
+        buffer = MappedFileContainer(self.path)
+        self.assertTrue(buffer.is_empty())
+        self.assertEqual(buffer.read_chunk(10), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from parsing.bufferio import StringContainer
+from parsing.commander import Commander
+from parsing.lexer import TableLexer
+from parsing.parser import AST
+from turing.environment import TheTape
+from turing.machine import TuringMachine
+
+
+def run_program(source: str, max_steps: int = 10000) -> str:
+    # The tape once the program finished, or after max_steps steps
+    tree = AST(TableLexer(StringContainer(source)))
+    tree.build_tree()
+    tape = TheTape()
+    machine = TuringMachine(tape)
+    tape.reset(True)
+    commander = Commander(tree)
+    steps = 0
+    while commander.has_next() and steps < max_steps:
+        commander.run_next(machine)
+        steps += 1
+    return ''.join(tape.memory)
+
+
+class TestComparisons(unittest.TestCase):
+    def test_operators(self):
+        # Each comparison writes y or n to its own cell
+        cases = [('<=', 2, 3, 'y'), ('<=', 3, 3, 'y'), ('<=', 4, 3, 'n'), ('>=', 2, 3, 'n'), ('>=', 3, 3, 'y'),
+                 ('>=', 4, 3, 'y'), ('<', 2, 3, 'y'), ('<', 3, 3, 'n'), ('>', 4, 3, 'y'), ('>', 3, 3, 'n'),
+                 ('!=', 2, 3, 'y'), ('!=', 3, 3, 'n'), ('=', 3, 3, 'y')]
+        source = ''.join("if({} {} {}) {{ write 'y'; }} else {{ write 'n'; }} right 1;\n".format(op, lhs, rhs)
+                         for op, lhs, rhs, _ in cases)
+        self.assertEqual(run_program(source), ''.join(expected for _, _, _, expected in cases) + '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
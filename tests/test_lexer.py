@@ -0,0 +1,80 @@
+import pathlib
+import unittest
+
+from parsing.bufferio import StringContainer
+from parsing.lexer import Lexer, TableLexer, TokenizedLexer, LexerError
+from parsing.tokens import TokenController
+
+samples = pathlib.Path(__file__).parent.parent / 'samples'
+
+sources = [
+    (samples / 'power_2.bt').read_text(),
+    "# only a comment",
+    "write 'a'; # trailing comment\n\n  right 12;\n# another\nleft 3;",
+    "f: { while(= read ' ') { right 1; } }\ngoto f;",
+    "if(= ^ '#') { write '\n'; }",
+]
+
+
+def lexemes(lexer) -> list:
+    result = []
+    while True:
+        lex = lexer.get_next()
+        if lex is None:
+            return result
+        result.append((lex.code, lex.token, lex.line))
+
+
+class TestTableLexer(unittest.TestCase):
+    def test_same_lexemes(self):
+        for source in sources:
+            with self.subTest(source=source[:20]):
+                expected = lexemes(Lexer(StringContainer(source)))
+                self.assertEqual(lexemes(TableLexer(StringContainer(source))), expected)
+                # Chunks smaller than the lookahead split lexemes and comments
+                self.assertEqual(lexemes(TableLexer(StringContainer(source), chunk_size=3)), expected)
+
+    def test_unexpected_symbol(self):
+        for lexer in (Lexer, TableLexer):
+            with self.subTest(lexer=lexer.__name__):
+                with self.assertRaisesRegex(LexerError, 'line 2'):
+                    lexemes(lexer(StringContainer("write 'a';\nwrite $;")))
+
+
+class TestTokenIndex(unittest.TestCase):
+    def test_longest_match(self):
+        source = "a!=b <= >= << >> < iffy reader if read goto_x"
+        for lexer in (Lexer, TableLexer):
+            with self.subTest(lexer=lexer.__name__):
+                self.assertEqual([code for code, _, _ in lexemes(lexer(StringContainer(source)))],
+                                 [302, 311, 302, 314, 315, 312, 313, ord('<'), 302, 302, 303, 306, 302])
+
+    def test_disabled_token(self):
+        # A disabled keyword is read as an identifier, the index is rebuilt when a token changes
+        token = next(t for t in TokenController.get_instance().tokens if t.code == 318)
+        token.enabled = False
+        try:
+            for lexer in (Lexer, TableLexer):
+                with self.subTest(lexer=lexer.__name__):
+                    self.assertEqual(lexemes(lexer(StringContainer("halt;")))[0][0], 302)
+        finally:
+            token.enabled = True
+        self.assertEqual(lexemes(TableLexer(StringContainer("halt;")))[0][0], 318)
+
+
+class TestTokenizedLexer(unittest.TestCase):
+    def test_same_lexemes(self):
+        for source in sources:
+            with self.subTest(source=source[:20]):
+                self.assertEqual(lexemes(TokenizedLexer(StringContainer(source), chunk_size=3)),
+                                 lexemes(TableLexer(StringContainer(source))))
+
+    def test_error_when_reached(self):
+        lexer = TokenizedLexer(StringContainer("write 'a';\nwrite $;"))
+        self.assertEqual([lexer.get_next().token for _ in range(4)], ['write', "'a'", ';', 'write'])
+        with self.assertRaisesRegex(LexerError, 'line 2'):
+            lexer.get_next()
+
+
+if __name__ == '__main__':
+    unittest.main()
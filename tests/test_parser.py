@@ -0,0 +1,85 @@
+import unittest
+
+from parsing.bufferio import StringContainer
+from parsing.commander import Commander
+from parsing.lexer import Lexer, TableLexer, TokenizedLexer
+from parsing.parser import AST, ParserError
+from turing.environment import TheTape
+from turing.machine import TuringMachine
+
+lexers = (Lexer, TableLexer, TokenizedLexer)
+
+
+def run_program(source: str, lexer: type) -> str:
+    tree = AST(lexer(StringContainer(source)))
+    tree.build_tree()
+    tape = TheTape()
+    machine = TuringMachine(tape)
+    tape.reset(True)
+    commander = Commander(tree)
+    steps = 0
+    while commander.has_next() and steps < 100:
+        commander.run_next(machine)
+        steps += 1
+    return ''.join(tape.memory)
+
+
+class TestEndOfInput(unittest.TestCase):
+    def test_identifier_at_end_is_an_error(self):
+        # The backtracking parser dropped it without a word with Lexer and TableLexer
+        for lexer in lexers:
+            for source in ("foo", "write 'a'; foo", "write 'a'; foo # comment"):
+                with self.subTest(lexer=lexer.__name__, source=source):
+                    with self.assertRaisesRegex(ParserError, 'Function name missing colon'):
+                        run_program(source, lexer)
+
+    def test_block_closed_at_end(self):
+        # The backtracking parser reported "Unmatched {" here with Lexer and TableLexer
+        for lexer in lexers:
+            for source, memory in [("f: { write 'a'; }", '0'), ("f: { write 'a'; } goto f;", 'a'),
+                                   ("if(= read '0') { write 'a'; }", 'a'),
+                                   ("if(= read '1') { write 'a'; } else { write 'b'; }", 'b'),
+                                   ("while(= read '0') { write 'a'; }", 'a')]:
+                with self.subTest(lexer=lexer.__name__, source=source):
+                    self.assertEqual(run_program(source, lexer), memory)
+
+    def test_trailing_separators(self):
+        # A stray } ends the program, anything after it is ignored, same as before
+        for lexer in lexers:
+            for source, memory in [("write 'a';;", 'a'), ("write 'a'; }", 'a'), ("write 'a'; } write 'b';", 'a'),
+                                   ("} write 'b';", '0'), ("{ write 'a'; } }", '0'), ("x: { } ;", '0')]:
+                with self.subTest(lexer=lexer.__name__, source=source):
+                    self.assertEqual(run_program(source, lexer), memory)
+
+
+class TestDeepNesting(unittest.TestCase):
+    depth = 10000
+
+    def test_nested_blocks(self):
+        source = "if(true) { " * self.depth + "write 'a';" + " }" * self.depth
+        self.assertEqual(run_program(source, TokenizedLexer), 'a')
+
+    def test_nested_expressions(self):
+        # An even number of negations
+        source = "if(" + "!(" * self.depth + "= read '0'" + ")" * self.depth + ") { write 'b'; }"
+        self.assertEqual(run_program(source, TokenizedLexer), 'b')
+
+    def test_traverse(self):
+        source = "f: { " + "while(!(true)) { " * self.depth + "}" * self.depth + " }"
+        tree = AST(TokenizedLexer(StringContainer(source)))
+        tree.build_tree()
+        self.assertEqual([lex.token for lex in tree.root.traverse()], source.replace('(', ' ( ').replace(')', ' ) ').split())
+
+
+class TestLexemes(unittest.TestCase):
+    def test_lexemes_are_not_kept(self):
+        lexer = TableLexer(StringContainer("write 'a'; right 1;\n" * 1000))
+        n = 0
+        while lexer.get_next() is not None:
+            n += 1
+        self.assertEqual(n, 6000)
+        self.assertFalse(any(isinstance(v, list) and len(v) > 0 for v in vars(lexer).values()))
+
+
+if __name__ == '__main__':
+    unittest.main()